@@ -1,9 +1,11 @@
 import re
 import pprint
+from collections import OrderedDict
 
 import jmespath
-from attr import asdict
-from typing import Dict, List, Any  # noqa
+import six
+from attr import asdict, fields, has
+from typing import Dict, List, Any, Callable, Iterator, Tuple  # noqa
 
 from chalice.deploy import models
 from chalice.deploy.planner import Variable, StringFormat
@@ -11,12 +13,30 @@ from chalice.awsclient import TypedAWSClient  # noqa
 from chalice.utils import UI  # noqa
 
 
+_FIRST_CAP_REGEX = re.compile('(.)([A-Z][a-z]+)')
+_END_CAP_REGEX = re.compile('([a-z0-9])([A-Z])')
+# Instruction classes are a small, fixed set so we only need to
+# compute the display name for each class once.
+_INSTRUCTION_NAME_CACHE = {}  # type: Dict[type, str]
+# Types of values that never contain variables.  Most values in API
+# params are one of these so we check for them before anything else.
+_LEAF_TYPES = frozenset(
+    (bytes, six.text_type, float, bool, type(None)) + six.integer_types)
+
+
 class BaseExecutor(object):
     def __init__(self, client, ui):
         # type: (TypedAWSClient, UI) -> None
         self._client = client
         self._ui = ui
-        self.resource_values = []  # type: List[Dict[str, Any]]
+        # Mapping of resource name to its recorded values, in the
+        # order the resources were first recorded.
+        self._resource_value_index = OrderedDict()  # type: Dict[str, Any]
+
+    @property
+    def resource_values(self):
+        # type: () -> List[Dict[str, Any]]
+        return list(self._resource_value_index.values())
 
     def execute(self, plan):
         # type: (models.Plan) -> None
@@ -30,18 +50,43 @@ class Executor(BaseExecutor):
         # A mapping of variables that's populated as API calls
         # are made.  These can be used in subsequent API calls.
         self.variables = {}  # type: Dict[str, Any]
-        self._resource_value_index = {}  # type: Dict[str, Any]
         self._variable_resolver = VariableResolver()
+        self._resolve = self._variable_resolver.resolve_variables
+        # Bound client methods, keyed by method name.  The client doesn't
+        # change for the lifetime of the executor so these are safe to reuse.
+        self._client_methods = {}  # type: Dict[str, Callable[..., Any]]
+        # Compiled JMESPath expressions, keyed by expression string.
+        self._jp_cache = {}  # type: Dict[str, Any]
+        # Mapping of instruction type to the handler for that type.
+        # This is built once so we don't have to look up the handler
+        # by name for every instruction we execute.
+        self._dispatch = {
+            models.APICall: self._do_apicall,
+            models.CopyVariable: self._do_copyvariable,
+            models.StoreValue: self._do_storevalue,
+            models.RecordResourceVariable: self._do_recordresourcevariable,
+            models.RecordResourceValue: self._do_recordresourcevalue,
+            models.JPSearch: self._do_jpsearch,
+            models.BuiltinFunction: self._do_builtinfunction,
+        }  # type: Dict[type, Callable[[Any], None]]
+        # Mapping of builtin function name to its implementation.
+        self._builtins = {
+            'parse_arn': self._builtin_parse_arn,
+        }  # type: Dict[str, Callable[[List[Any]], Any]]
 
     def execute(self, plan):
         # type: (models.Plan) -> None
-        messages = plan.messages
+        # These are bound to locals up front to avoid repeated
+        # attribute lookups for every instruction in the plan.
+        get_message = plan.messages.get
+        write = self._ui.write
+        get_handler = self._dispatch.get
+        default_handler = self._default_handler
         for instruction in plan.instructions:
-            message = messages.get(id(instruction))
+            message = get_message(id(instruction))
             if message is not None:
-                self._ui.write(message)
-            getattr(self, '_do_%s' % instruction.__class__.__name__.lower(),
-                    self._default_handler)(instruction)
+                write(message)
+            get_handler(type(instruction), default_handler)(instruction)
 
     def _default_handler(self, instruction):
         # type: (models.Instruction) -> None
@@ -52,7 +97,11 @@ class Executor(BaseExecutor):
     def _do_apicall(self, instruction):
         # type: (models.APICall) -> None
         final_kwargs = self._resolve_variables(instruction)
-        method = getattr(self._client, instruction.method_name)
+        method_name = instruction.method_name
+        method = self._client_methods.get(method_name)
+        if method is None:
+            method = getattr(self._client, method_name)
+            self._client_methods[method_name] = method
         result = method(**final_kwargs)
         if instruction.output_var is not None:
             self.variables[instruction.output_var] = result
@@ -65,8 +114,7 @@ class Executor(BaseExecutor):
 
     def _do_storevalue(self, instruction):
         # type: (models.StoreValue) -> None
-        result = self._variable_resolver.resolve_variables(
-            instruction.value, self.variables)
+        result = self._resolve(instruction.value, self.variables)
         self.variables[instruction.name] = result
 
     def _do_recordresourcevariable(self, instruction):
@@ -90,77 +138,128 @@ class Executor(BaseExecutor):
     def _add_to_deployed_values(self, payload):
         # type: (Dict[str, str]) -> None
         key = payload['name']
-        if key not in self._resource_value_index:
+        existing = self._resource_value_index.get(key)
+        if existing is None:
             self._resource_value_index[key] = payload
-            self.resource_values.append(payload)
         else:
             # If the key already exists, we merge the new payload
             # with the existing payload.
-            self._resource_value_index[key].update(payload)
+            existing.update(payload)
 
     def _do_jpsearch(self, instruction):
         # type: (models.JPSearch) -> None
         v = self.variables[instruction.input_var]
-        result = jmespath.search(instruction.expression, v)
+        expression = instruction.expression
+        compiled = self._jp_cache.get(expression)
+        if compiled is None:
+            compiled = jmespath.compile(expression)
+            self._jp_cache[expression] = compiled
+        result = compiled.search(v)
         self.variables[instruction.output_var] = result
 
     def _do_builtinfunction(self, instruction):
         # type: (models.BuiltinFunction) -> None
-        # Split this out to a separate class of built in functions
-        # once we add more functions.
-        if instruction.function_name == 'parse_arn':
-            resolved_args = self._variable_resolver.resolve_variables(
-                instruction.args, self.variables)
-            value = resolved_args[0]
-            parts = value.split(':')
-            result = {
-                'service': parts[2],
-                'region': parts[3],
-                'account_id': parts[4],
-            }
-            self.variables[instruction.output_var] = result
-        else:
+        function = self._builtins.get(instruction.function_name)
+        if function is None:
             raise ValueError("Unknown builtin function: %s"
                              % instruction.function_name)
+        args = instruction.args
+        # Builtins are typically called with a single variable or string
+        # literal so we can skip walking the args in that case.
+        if len(args) == 1 and isinstance(args[0], Variable):
+            resolved_args = [self.variables[args[0].name]]
+        elif len(args) == 1 and isinstance(args[0], six.string_types):
+            resolved_args = args
+        else:
+            resolved_args = self._resolve(args, self.variables)
+        self.variables[instruction.output_var] = function(resolved_args)
+
+    def _builtin_parse_arn(self, args):
+        # type: (List[Any]) -> Dict[str, str]
+        value = args[0]
+        parts = value.split(':', 5)
+        return {
+            'service': parts[2],
+            'region': parts[3],
+            'account_id': parts[4],
+        }
 
     def _resolve_variables(self, api_call):
         # type: (models.APICall) -> Dict[str, Any]
         try:
-            return self._variable_resolver.resolve_variables(
-                api_call.params, self.variables)
+            return self._resolve(api_call.params, self.variables)
         except UnresolvedValueError as e:
             e.method_name = api_call.method_name
             raise
 
 
 class VariableResolver(object):
+    # The resolver doesn't hold any per instance state.
+    __slots__ = ()
+
     def resolve_variables(self, value, variables):
         # type: (Any, Dict[str, str]) -> Any
-        if isinstance(value, Variable):
-            return variables[value.name]
-        elif isinstance(value, StringFormat):
-            v = {k: variables[k] for k in value.variables}
-            return value.template.format(**v)
-        elif isinstance(value, models.Placeholder):
-            # The key and method_name values are added
-            # as the exception propagates up the stack.
-            raise UnresolvedValueError('', value, '')
-        elif isinstance(value, dict):
-            final = {}
-            for k, v in value.items():
-                try:
-                    final[k] = self.resolve_variables(v, variables)
-                except UnresolvedValueError as e:
-                    e.key = k
-                    raise
-            return final
-        elif isinstance(value, list):
-            final_list = []
-            for v in value:
-                final_list.append(self.resolve_variables(v, variables))
-            return final_list
-        else:
-            return value
+        # The value is walked iteratively rather than recursively so we
+        # don't pay for a function call per nested dict/list.  Containers
+        # are copied and their values are then resolved in place.  The
+        # stack holds an iterator over the items of each container being
+        # resolved, so a nested container is finished before any of its
+        # later siblings, the same depth first order as a recursive walk.
+        # Each entry also tracks the top level parameter name the
+        # container belongs to so we can report it if we find an
+        # unresolved value.  Since the whole walk happens in this one
+        # call, the globals checked for every value are bound to locals
+        # up front.
+        leaf_types = _LEAF_TYPES
+        variable_type = Variable
+        string_format_type = StringFormat
+        placeholder_type = models.Placeholder
+        result = [value]
+        stack = [
+            (enumerate(result), result, None, False)
+        ]  # type: List[Tuple[Iterator[Tuple[Any, Any]], Any, Any, bool]]
+        while stack:
+            items, container, param_key, use_item_key = stack[-1]
+            for k, v in items:
+                t = type(v)
+                if t in leaf_types:
+                    continue
+                elif isinstance(v, (dict, list)):
+                    # Subclasses of dict/list are resolved into plain
+                    # dicts/lists.
+                    copied = dict(v) if isinstance(v, dict) else list(v)
+                elif isinstance(v, variable_type):
+                    container[k] = variables[v.name]
+                    continue
+                elif isinstance(v, string_format_type):
+                    fmt_vars = {name: variables[name] for name in v.variables}
+                    container[k] = v.template.format(**fmt_vars)
+                    continue
+                elif isinstance(v, placeholder_type):
+                    # The method_name value is added as the exception
+                    # propagates up the stack.
+                    key = k if use_item_key else param_key
+                    raise UnresolvedValueError(
+                        '' if key is None else key, v, '')
+                else:
+                    continue
+                container[k] = copied
+                if copied:
+                    key = k if use_item_key else param_key
+                    stack.append(self._container_entry(copied, key))
+                    break
+            else:
+                stack.pop()
+        return result[0]
+
+    def _container_entry(self, container, param_key):
+        # type: (Any, Any) -> Tuple[Iterator[Tuple[Any, Any]], Any, Any, bool]
+        if type(container) is dict:
+            # Values in a dict with no parent dict are reported under
+            # their own key.
+            return (iter(container.items()), container, param_key,
+                    param_key is None)
+        return enumerate(container), container, param_key, False
 
 
 # This class is used for the ``chalice dev plan`` command.
@@ -171,6 +270,15 @@ class DisplayOnlyExecutor(BaseExecutor):
     # Max length of bytes object before we truncate with '<bytes>'
     _MAX_BYTE_LENGTH = 30
     _LINE_VERTICAL = u'\u2502'
+    _CONTAINER_TYPES = (dict, list, tuple, set, frozenset)
+    # Format methods for an instruction line and for a line within a
+    # formatted dict value.  These are only built once and take the
+    # ``(name, key, value)`` and ``(key, value)`` respectively.
+    _LINE_FORMAT = (u'{!s:<30} ' + _LINE_VERTICAL + u'{:>20} {!s:<10}').format
+    _DICT_LINE_FORMAT = (
+        u' ' * 31 + _LINE_VERTICAL + u' ' * 15 + _LINE_VERTICAL +
+        u'{:>20} {!s:<10}'
+    ).format
 
     def execute(self, plan):
         # type: (models.Plan) -> None
@@ -178,8 +286,7 @@ class DisplayOnlyExecutor(BaseExecutor):
         self._ui.write("Plan\n")
         self._ui.write("====\n\n")
         for instruction in plan.instructions:
-            getattr(self, '_do_%s' % instruction.__class__.__name__.lower(),
-                    self._default_handler)(instruction, spillover_values)
+            self._default_handler(instruction, spillover_values)
         self._write_spillover(spillover_values)
 
     def _write_spillover(self, spillover_values):
@@ -194,17 +301,38 @@ class DisplayOnlyExecutor(BaseExecutor):
 
     def _default_handler(self, instruction, spillover_values):
         # type: (models.Instruction, Dict[str, Any]) -> None
-        instruction_name = self._upper_snake_case(
-            instruction.__class__.__name__)
-        for key, value in asdict(instruction).items():
+        instruction_name = self._get_instruction_name(instruction)
+        # All the lines for an instruction are written out at once.
+        lines = []  # type: List[str]
+        # The fields are read directly rather than converting the whole
+        # instruction with asdict(), so only values that are containers
+        # need to be converted to plain dicts/lists.
+        for field in fields(type(instruction)):
+            key = field.name
+            value = getattr(instruction, key)
+            if isinstance(value, self._CONTAINER_TYPES) or has(type(value)):
+                value = self._to_plain_value(value)
             if isinstance(value, dict):
                 value = self._format_dict(value, spillover_values)
-            line = ('%-30s %s%20s %-10s' % (
-                instruction_name, self._LINE_VERTICAL, '%s:' % key, value)
-            )
-            self._ui.write(line + '\n')
+            line = self._LINE_FORMAT(
+                instruction_name, u'{}:'.format(key), value)
+            lines.append(line + '\n')
             instruction_name = ''
-        self._ui.write('\n')
+        lines.append('\n')
+        self._ui.write(''.join(lines))
+
+    def _to_plain_value(self, value):
+        # type: (Any) -> Any
+        # This matches how asdict() converts nested values: attrs
+        # instances and dict subclasses become dicts, and all other
+        # collections become lists.
+        if has(type(value)):
+            return asdict(value)
+        elif isinstance(value, dict):
+            return {k: self._to_plain_value(v) for k, v in value.items()}
+        elif isinstance(value, self._CONTAINER_TYPES):
+            return [self._to_plain_value(v) for v in value]
+        return value
 
     def _format_dict(self, dict_value, spillover_values):
         # type: (Dict[str, Any], Dict[str, Any]) -> str
@@ -221,19 +349,23 @@ class DisplayOnlyExecutor(BaseExecutor):
                     key.upper(), len(spillover_values))
                 spillover_values[spillover_name] = value
                 value = spillover_name
-            line = '%-31s%s%-15s%s%20s %-10s' % (
-                ' ', self._LINE_VERTICAL, ' ', self._LINE_VERTICAL,
-                '%s:' % key, value
-            )
+            line = self._DICT_LINE_FORMAT(u'{}:'.format(key), value)
             lines.append(line)
         return '\n'.join(lines)
 
+    def _get_instruction_name(self, instruction):
+        # type: (models.Instruction) -> str
+        cls = type(instruction)
+        name = _INSTRUCTION_NAME_CACHE.get(cls)
+        if name is None:
+            name = self._upper_snake_case(cls.__name__)
+            _INSTRUCTION_NAME_CACHE[cls] = name
+        return name
+
     def _upper_snake_case(self, v):
         # type: (str) -> str
-        first_cap_regex = re.compile('(.)([A-Z][a-z]+)')
-        end_cap_regex = re.compile('([a-z0-9])([A-Z])')
-        first = first_cap_regex.sub(r'\1_\2', v)
-        transformed = end_cap_regex.sub(r'\1_\2', first).upper()
+        first = _FIRST_CAP_REGEX.sub(r'\1_\2', v)
+        transformed = _END_CAP_REGEX.sub(r'\1_\2', first).upper()
         return transformed
 
 
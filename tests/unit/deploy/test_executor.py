@@ -1,4 +1,6 @@
 import re
+from collections import OrderedDict
+
 import mock
 import pytest
 
@@ -33,6 +35,17 @@ class TestExecutor(object):
 
         self.mock_client.create_role.assert_called_with(**params)
 
+    def test_can_invoke_same_api_call_multiple_times(self):
+        self.execute([
+            APICall('create_role', {'name': 'foo'}),
+            APICall('create_role', {'name': 'bar'}),
+        ])
+
+        assert self.mock_client.create_role.call_args_list == [
+            mock.call(name='foo'),
+            mock.call(name='bar'),
+        ]
+
     def test_can_store_api_result(self):
         params = {'name': 'foo', 'trust_policy': {'trust': 'policy'},
                   'policy': {'iam': 'policy'}}
@@ -133,6 +146,38 @@ class TestExecutor(object):
             'key2': 'value2',
         }]
 
+    def test_resource_values_kept_in_recorded_order(self):
+        self.execute([
+            RecordResourceValue(
+                resource_type='lambda_function',
+                resource_name='first',
+                name='key1',
+                value='value1',
+            ),
+            RecordResourceValue(
+                resource_type='lambda_function',
+                resource_name='second',
+                name='key1',
+                value='value2',
+            ),
+            RecordResourceValue(
+                resource_type='lambda_function',
+                resource_name='first',
+                name='key2',
+                value='value3',
+            ),
+        ])
+        assert self.executor.resource_values == [{
+            'name': 'first',
+            'resource_type': 'lambda_function',
+            'key1': 'value1',
+            'key2': 'value3',
+        }, {
+            'name': 'second',
+            'resource_type': 'lambda_function',
+            'key1': 'value2',
+        }]
+
     def test_new_keys_override_old_keys(self):
         self.execute([
             RecordResourceValue(
@@ -171,6 +216,16 @@ class TestExecutor(object):
         ])
         assert self.executor.variables['result'] == 'baz'
 
+    def test_can_reuse_jp_search_expression(self):
+        self.execute([
+            StoreValue(name='first', value={'foo': {'bar': 'one'}}),
+            StoreValue(name='second', value={'foo': {'bar': 'two'}}),
+            JPSearch('foo.bar', input_var='first', output_var='result1'),
+            JPSearch('foo.bar', input_var='second', output_var='result2'),
+        ])
+        assert self.executor.variables['result1'] == 'one'
+        assert self.executor.variables['result2'] == 'two'
+
     def test_can_copy_variable(self):
         self.execute([
             StoreValue(name='foo', value='bar'),
@@ -195,6 +250,37 @@ class TestExecutor(object):
             'service': 'lambda'
         }
 
+    def test_can_call_builtin_function_with_literal(self):
+        self.execute([
+            BuiltinFunction(
+                function_name='parse_arn',
+                args=['arn:aws:lambda:us-west-2:123:function:name'],
+                output_var='result',
+            )
+        ])
+        assert self.executor.variables['result'] == {
+            'account_id': '123',
+            'region': 'us-west-2',
+            'service': 'lambda'
+        }
+
+    def test_can_call_builtin_function_with_format_string(self):
+        self.execute([
+            StoreValue(name='region', value='us-west-2'),
+            BuiltinFunction(
+                function_name='parse_arn',
+                args=[StringFormat(
+                    'arn:aws:lambda:{region}:123:function:name',
+                    ['region'])],
+                output_var='result',
+            )
+        ])
+        assert self.executor.variables['result'] == {
+            'account_id': '123',
+            'region': 'us-west-2',
+            'service': 'lambda'
+        }
+
     def test_errors_out_on_unknown_function(self):
         with pytest.raises(ValueError):
             self.execute([
@@ -286,6 +372,32 @@ class TestDisplayOnlyExecutor(object):
         plan_output = self.get_plan_output([call])
         assert 'zip_contents: <bytes>' in plan_output
 
+    def test_can_display_non_string_keys(self):
+        plan_output = self.get_plan_output([
+            StoreValue(name='foo', value={1: 'one'}),
+        ])
+        assert '1: one' in plan_output
+
+    def test_nested_values_displayed_as_plain_types(self):
+        params = OrderedDict([
+            ('tags', OrderedDict([('b', '1'), ('a', '2')])),
+            ('layers', ('layer1', 'layer2')),
+        ])
+        plan_output = self.get_plan_output([
+            APICall('create_function', params),
+            RecordResourceValue(
+                resource_type='lambda_function',
+                resource_name='myfunction',
+                name='layers',
+                value=('a', 'b'),
+            ),
+        ])
+        assert 'tags: ${TAGS_0}' in plan_output
+        assert 'layers: ${LAYERS_1}' in plan_output
+        assert "value: ['a', 'b']" in plan_output
+        assert "${TAGS_0}:\n{'a': '2', 'b': '1'}" in plan_output
+        assert "${LAYERS_1}:\n['layer1', 'layer2']" in plan_output
+
     def test_can_print_multiple_instructions(self):
         instructions = [
             JPSearch(expression='foo.bar', input_var='in1', output_var='out1'),
@@ -337,6 +449,35 @@ class TestResolveVariables(object):
         assert raised_exception.key == 'foo'
         assert raised_exception.value == models.Placeholder.BUILD_STAGE
 
+    def test_unresolved_error_reports_top_level_key(self):
+        with pytest.raises(UnresolvedValueError) as excinfo:
+            self.resolve_vars(
+                {'foo': {'bar': [models.Placeholder.BUILD_STAGE]}}, {})
+        assert excinfo.value.key == 'foo'
+
+    def test_unresolved_error_reports_first_placeholder(self):
+        placeholder = models.Placeholder.BUILD_STAGE
+        with pytest.raises(UnresolvedValueError) as excinfo:
+            self.resolve_vars(
+                {'a': [1, {'b': placeholder}], 'c': placeholder}, {})
+        assert excinfo.value.key == 'a'
+        with pytest.raises(UnresolvedValueError) as excinfo:
+            self.resolve_vars(
+                [{'x': 1}, {'y': placeholder}, {'z': placeholder}], {})
+        assert excinfo.value.key == 'y'
+
+    def test_unresolved_error_keeps_falsy_key(self):
+        with pytest.raises(UnresolvedValueError) as excinfo:
+            self.resolve_vars({0: models.Placeholder.BUILD_STAGE}, {})
+        assert excinfo.value.key == 0
+
+    def test_does_not_modify_original_params(self):
+        params = {'foo': [{'bar': Variable('myvar')}]}
+        assert self.resolve_vars(params, {'myvar': 'value'}) == {
+            'foo': [{'bar': 'value'}],
+        }
+        assert params == {'foo': [{'bar': Variable('myvar')}]}
+
     def test_can_resolve_nested_variable_refs(self):
         assert self.resolve_vars(
             {'foo': {'bar': Variable('myvar')}},
@@ -370,6 +511,19 @@ class TestResolveVariables(object):
             }
         }
 
+    def test_plain_values_returned_as_is(self):
+        params = {'str': 'foo', 'bytes': b'foo', 'int': 1, 'float': 1.5,
+                  'bool': True, 'none': None}
+        assert self.resolve_vars(params, {}) == params
+        assert self.resolve_vars('foo', {}) == 'foo'
+
+    def test_empty_containers_are_copied(self):
+        params = {'foo': {}, 'bar': []}
+        resolved = self.resolve_vars(params, {})
+        assert resolved == {'foo': {}, 'bar': []}
+        assert resolved['foo'] is not params['foo']
+        assert resolved['bar'] is not params['bar']
+
     def test_can_handle_format_string(self):
         params = {'bar': StringFormat('value: {my_var}', ['my_var'])}
         variables = {'my_var': 'foo'}